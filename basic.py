@@ -1,49 +1,70 @@
 # /// script
 # requires-python = ">=3.8"
-# dependencies = ["requests", "rich"]
+# dependencies = ["requests", "requests-cache", "aiohttp", "orjson", "rich"]
 # ///
 
+import asyncio
+import io
+import time
+import aiohttp
+import orjson
 import requests
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
+from rich.console import Console, Group
+from datetime import timedelta
 from typing import Dict, Any, List, Optional
 
 # Constants
 API_BASE_URL = "https://azura.theindiebeat.fm/api"
 USER_AGENT = "TheIndieBeat-ChannelLister/1.0"
 
+# Summary table status labels
+ART_AVAILABLE = "✅ Available"
+ART_NOT_AVAILABLE = "❌ Not Available"
+STATUS_ONLINE = "ONLINE"
+STATUS_OFFLINE = "OFFLINE"
+
+# Shared session so repeated API calls reuse pooled connections. The station
+# list changes rarely so it is cached on disk.
+SESSION = CachedSession("tibr_cache.sqlite", expire_after=timedelta(minutes=15),
+                        allowable_methods=("GET",), use_cache_dir=True)
+SESSION.headers["User-Agent"] = USER_AGENT
+SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                      max_retries=Retry(total=3, backoff_factor=0.3)))
+
 
 def fetch_stations():
     """Fetch all stations from the AzuraCast API."""
-    headers = {
-        "User-Agent": USER_AGENT
-    }
-
     try:
-        response = requests.get(f"{API_BASE_URL}/stations", headers=headers)
+        response = SESSION.get(f"{API_BASE_URL}/stations")
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(response.content)
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
         print(f"Error fetching stations: {e}")
         return []
 
 
-def fetch_now_playing(station_id):
-    """Fetch current playing track information for a station."""
-    headers = {
-        "User-Agent": USER_AGENT
-    }
+async def fetch_all_now_playing(shortcodes: List[str]) -> Dict[str, Any]:
+    """Fetch now playing information for several stations concurrently."""
+    connector = aiohttp.TCPConnector(limit_per_host=64)
 
-    try:
-        response = requests.get(
-            f"{API_BASE_URL}/nowplaying/{station_id}", headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching now playing for {station_id}: {e}")
-        return None
+    async def fetch_one(session, station_id):
+        try:
+            async with session.get(f"{API_BASE_URL}/nowplaying/{station_id}") as response:
+                response.raise_for_status()
+                return station_id, orjson.loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+            print(f"Error fetching now playing for {station_id}: {e}")
+            return station_id, None
+
+    async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT},
+                                     connector=connector) as session:
+        results = await asyncio.gather(
+            *[fetch_one(session, sc) for sc in shortcodes])
+
+    return dict(results)
 
 
 def format_timestamp(timestamp: Optional[int]) -> str:
@@ -51,13 +72,20 @@ def format_timestamp(timestamp: Optional[int]) -> str:
     if not timestamp:
         return "NULL"
     try:
-        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-    except (ValueError, TypeError):
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+    except (ValueError, TypeError, OSError, OverflowError):
         return "NULL"
 
 
+def art_status(art_url: Optional[str]) -> str:
+    """Return the channel art label for the summary table."""
+    return ART_AVAILABLE if art_url and art_url != "NULL" else ART_NOT_AVAILABLE
+
+
 def display_station_summary(stations: List[Dict[str, Any]]):
     """Display a summary table of all stations."""
+    from rich.table import Table
+
     console = Console()
 
     table = Table(
@@ -70,126 +98,128 @@ def display_station_summary(stations: List[Dict[str, Any]]):
     table.add_column("Channel Art", style="magenta")
     table.add_column("Status", style="red")
 
-    for station in stations:
-        # Get the status for the station
-        is_online = "ONLINE" if station.get("is_public", False) else "OFFLINE"
-
-        # Check if channel art exists
-        art_url = station.get("art", "NULL")
-        art_status = "✅ Available" if art_url and art_url != "NULL" else "❌ Not Available"
-
-        table.add_row(
+    rows = [
+        (
             str(station.get("id", "NULL")),
             station.get("name", "NULL"),
             station.get("shortcode", "NULL"),
-            station.get("description", "NULL") or "NULL",
-            art_status,
-            is_online
+            station.get("description") or "NULL",
+            art_status(station.get("art", "NULL")),
+            STATUS_ONLINE if station.get("is_public", False) else STATUS_OFFLINE,
         )
+        for station in stations
+    ]
+
+    for row in rows:
+        table.add_row(*row)
 
     console.print(table)
 
 
 def display_stations_detailed(stations: List[Dict[str, Any]]):
     """Display detailed information about each station."""
+    from rich.panel import Panel
+    from rich.text import Text
+
     console = Console()
 
     console.print(Panel(
         f"[bold blue]The Indie Beat Radio Channels[/bold blue] - {len(stations)} channels found", expand=False))
 
+    # Fetch now playing information for all stations up front
+    now_playing_data = asyncio.run(fetch_all_now_playing(
+        [station.get("shortcode", "") for station in stations]))
+
+    panels = []
     for idx, station in enumerate(stations):
-        # Fetch now playing information for more metadata
-        now_playing = fetch_now_playing(station.get("shortcode", ""))
+        get = station.get
+        now_playing = now_playing_data.get(get("shortcode", ""))
 
         # Create a panel for each station
-        station_info = [
-            f"[bold cyan]Channel #{idx+1}[/bold cyan]",
-            f"[bold]ID:[/bold] {station.get('id', 'NULL')}",
-            f"[bold]Name:[/bold] {station.get('name', 'NULL')}",
-            f"[bold]Shortcode:[/bold] {station.get('shortcode', 'NULL')}",
-            f"[bold]Description:[/bold] {station.get('description', 'NULL') or 'NULL'}",
-            f"[bold]Genre:[/bold] {station.get('genre', 'NULL') or 'NULL'}",
-            f"[bold]URL:[/bold] {station.get('url', 'NULL') or 'NULL'}",
-
-            # Station broadcasting details
-            f"[bold]Frontend:[/bold] {station.get('frontend', 'NULL') or 'NULL'}",
-            f"[bold]Backend:[/bold] {station.get('backend', 'NULL') or 'NULL'}",
-            f"[bold]Listen URL:[/bold] {station.get('listen_url', 'NULL') or 'NULL'}",
-            f"[bold]Public Player URL:[/bold] {station.get('public_player_url', 'NULL') or 'NULL'}",
-            f"[bold]Playlist URL (PLS):[/bold] {station.get('playlist_pls_url', 'NULL') or 'NULL'}",
-            f"[bold]Playlist URL (M3U):[/bold] {station.get('playlist_m3u_url', 'NULL') or 'NULL'}",
-
-            # Channel art (station art)
-            f"[bold]Channel Art URL:[/bold] {station.get('art', 'NULL') or 'NULL'}",
-
-            # Status info
-            f"[bold]Is Public:[/bold] {str(station.get('is_public', 'NULL'))}",
-            f"[bold]Timezone:[/bold] {station.get('timezone', 'NULL') or 'NULL'}",
-        ]
+        buf = io.StringIO()
+        write = buf.write
+        write(f"[bold cyan]Channel #{idx+1}[/bold cyan]\n"
+              f"[bold]ID:[/bold] {get('id', 'NULL')}\n"
+              f"[bold]Name:[/bold] {get('name', 'NULL')}\n"
+              f"[bold]Shortcode:[/bold] {get('shortcode', 'NULL')}\n"
+              f"[bold]Description:[/bold] {get('description') or 'NULL'}\n"
+              f"[bold]Genre:[/bold] {get('genre') or 'NULL'}\n"
+              f"[bold]URL:[/bold] {get('url') or 'NULL'}\n"
+
+              # Station broadcasting details
+              f"[bold]Frontend:[/bold] {get('frontend') or 'NULL'}\n"
+              f"[bold]Backend:[/bold] {get('backend') or 'NULL'}\n"
+              f"[bold]Listen URL:[/bold] {get('listen_url') or 'NULL'}\n"
+              f"[bold]Public Player URL:[/bold] {get('public_player_url') or 'NULL'}\n"
+              f"[bold]Playlist URL (PLS):[/bold] {get('playlist_pls_url') or 'NULL'}\n"
+              f"[bold]Playlist URL (M3U):[/bold] {get('playlist_m3u_url') or 'NULL'}\n"
+
+              # Channel art (station art)
+              f"[bold]Channel Art URL:[/bold] {get('art') or 'NULL'}\n"
+
+              # Status info
+              f"[bold]Is Public:[/bold] {str(get('is_public', 'NULL'))}\n"
+              f"[bold]Timezone:[/bold] {get('timezone') or 'NULL'}\n")
 
         # Mount points information
-        mounts = station.get('mounts', [])
+        mounts = get('mounts', [])
         if mounts:
-            station_info.append(
-                f"\n[bold magenta]MOUNT POINTS ({len(mounts)}):[/bold magenta]")
+            write(f"\n[bold magenta]MOUNT POINTS ({len(mounts)}):[/bold magenta]\n")
             for i, mount in enumerate(mounts):
-                station_info.extend([
-                    f"  [bold]Mount #{i+1}:[/bold] {mount.get('name', 'NULL')}",
-                    f"  [bold]URL:[/bold] {mount.get('url', 'NULL')}",
-                    f"  [bold]Bitrate:[/bold] {mount.get('bitrate', 'NULL') or 'NULL'} kbps",
-                    f"  [bold]Format:[/bold] {mount.get('format', 'NULL') or 'NULL'}",
-                    f"  [bold]Is Default:[/bold] {str(mount.get('is_default', False))}",
-                    ""
-                ])
+                mount_get = mount.get
+                write(f"  [bold]Mount #{i+1}:[/bold] {mount_get('name', 'NULL')}\n"
+                      f"  [bold]URL:[/bold] {mount_get('url', 'NULL')}\n"
+                      f"  [bold]Bitrate:[/bold] {mount_get('bitrate') or 'NULL'} kbps\n"
+                      f"  [bold]Format:[/bold] {mount_get('format') or 'NULL'}\n"
+                      f"  [bold]Is Default:[/bold] {str(mount_get('is_default', False))}\n"
+                      "\n")
 
         # HLS streaming info
-        if station.get('hls_enabled', False):
-            station_info.extend([
-                f"\n[bold yellow]HLS STREAMING:[/bold yellow]",
-                f"  [bold]HLS Enabled:[/bold] {str(station.get('hls_enabled', False))}",
-                f"  [bold]HLS Is Default:[/bold] {str(station.get('hls_is_default', False))}",
-                f"  [bold]HLS URL:[/bold] {station.get('hls_url', 'NULL') or 'NULL'}",
-                f"  [bold]HLS Listeners:[/bold] {station.get('hls_listeners', 0)}"
-            ])
+        if get('hls_enabled', False):
+            write(f"\n[bold yellow]HLS STREAMING:[/bold yellow]\n"
+                  f"  [bold]HLS Enabled:[/bold] {str(get('hls_enabled', False))}\n"
+                  f"  [bold]HLS Is Default:[/bold] {str(get('hls_is_default', False))}\n"
+                  f"  [bold]HLS URL:[/bold] {get('hls_url') or 'NULL'}\n"
+                  f"  [bold]HLS Listeners:[/bold] {get('hls_listeners', 0)}\n")
 
         # Add now playing information if available
         if now_playing:
-            station_info.append("\n[bold green]NOW PLAYING:[/bold green]")
+            write("\n[bold green]NOW PLAYING:[/bold green]\n")
 
             np = now_playing.get("now_playing", {})
             song = np.get("song", {}) if np else {}
 
             if song:
-                station_info.extend([
-                    f"  [bold]Title:[/bold] {song.get('title', 'NULL') or 'NULL'}",
-                    f"  [bold]Artist:[/bold] {song.get('artist', 'NULL') or 'NULL'}",
-                    f"  [bold]Album:[/bold] {song.get('album', 'NULL') or 'NULL'}",
-                    f"  [bold]Album Art URL:[/bold] {song.get('art', 'NULL') or 'NULL'}"
-                ])
+                song_get = song.get
+                write(f"  [bold]Title:[/bold] {song_get('title') or 'NULL'}\n"
+                      f"  [bold]Artist:[/bold] {song_get('artist') or 'NULL'}\n"
+                      f"  [bold]Album:[/bold] {song_get('album') or 'NULL'}\n"
+                      f"  [bold]Album Art URL:[/bold] {song_get('art') or 'NULL'}\n")
 
                 # Add any custom fields if available
-                custom_fields = song.get("custom_fields", {})
+                custom_fields = song_get("custom_fields", {})
                 if custom_fields:
-                    station_info.append(
-                        "\n  [bold yellow]CUSTOM FIELDS:[/bold yellow]")
+                    write("\n  [bold yellow]CUSTOM FIELDS:[/bold yellow]\n")
                     for key, value in custom_fields.items():
-                        station_info.append(
-                            f"    [bold]{key}:[/bold] {value if value else 'NULL'}")
+                        write(f"    [bold]{key}:[/bold] {value if value else 'NULL'}\n")
 
             # Add listener info
             listeners = now_playing.get("listeners", {})
             if listeners:
-                station_info.extend([
-                    f"\n  [bold]Current Listeners:[/bold] {listeners.get('current', 0)}",
-                    f"  [bold]Unique Listeners:[/bold] {listeners.get('unique', 0)}"
-                ])
+                write(f"\n  [bold]Current Listeners:[/bold] {listeners.get('current', 0)}\n"
+                      f"  [bold]Unique Listeners:[/bold] {listeners.get('unique', 0)}\n")
+
+        # Every line is newline-terminated, so drop the final one
+        station_text = buf.getvalue()[:-1]
+
+        if panels:
+            panels.append(Text(""))  # Add space between stations
 
-        # Display station panel
-        console.print(Panel("\n".join(station_info), title=station.get("name", f"Channel {idx+1}"),
+        panels.append(Panel(station_text, title=get("name", f"Channel {idx+1}"),
                             border_style="green"))
 
-        if idx < len(stations) - 1:
-            console.print()  # Add space between stations
+    # Display all station panels in one go
+    console.print(Group(*panels))
 
 
 def main():
@@ -3,42 +3,102 @@
 # requires-python = ">=3.11"
 # dependencies = [
 #   "requests",
+#   "requests-cache",
 #   "aiohttp",
+#   "orjson",
+#   "uvloop>=0.18; sys_platform != 'win32'",
+#   "tenacity",
 #   "rich"
 # ]
 # ///
 import requests
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
 import asyncio
 import aiohttp
+import orjson
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 import argparse
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom import minidom
-from datetime import datetime, UTC
+from xml.etree.ElementTree import Element, ElementTree, SubElement, indent
+from datetime import datetime, timedelta, UTC
 import sys
 from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
 import os
 
 console = Console()
 
+# Maximum number of stream health checks in flight at once
+MAX_CONCURRENT_CHECKS = 32
+
+# Number of completed health checks between progress display updates
+PROGRESS_BATCH = 8
+
+# Shared session so API calls reuse pooled connections and repeat runs
+# are served from the on-disk cache
+SESSION = CachedSession('tibr_cache.sqlite', expire_after=timedelta(minutes=15),
+                        allowable_methods=('GET',), use_cache_dir=True)
+SESSION.headers['accept'] = 'application/json'
+SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                      max_retries=Retry(total=3, backoff_factor=0.3)))
+
 
 class StreamHealthCheck:
     def __init__(self, timeout=5):
         self.timeout = timeout
         self.results = {}
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit_per_host=32, ttl_dns_cache=300),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    @staticmethod
+    def _raise_if_retryable(response):
+        # Rate limiting and server errors are worth another attempt
+        if response.status == 429 or response.status >= 500:
+            response.raise_for_status()
+
+    # Timeouts are not retried, a dead stream would hold a slot for several
+    # full timeouts
+    @retry(stop=stop_after_attempt(3),
+           wait=wait_exponential(multiplier=0.3, max=2),
+           retry=retry_if_exception_type(aiohttp.ClientError),
+           reraise=True)
+    async def _probe(self, url):
+        # HEAD avoids pulling any stream data just to confirm reachability
+        async with self.session.head(url, allow_redirects=True) as response:
+            if response.status not in (405, 501):
+                self._raise_if_retryable(response)
+                return url, response.status < 400, response.status
+
+        # Server doesn't support HEAD, fall back to a minimal ranged GET
+        async with self.session.get(url, headers={'Range': 'bytes=0-0'}) as response:
+            self._raise_if_retryable(response)
+            if response.status >= 400:
+                return url, False, response.status
+            # Take whatever the first chunk is to confirm data is flowing
+            chunk = await response.content.readany()
+            return url, bool(chunk) or response.status == 200, response.status
 
     async def check_stream(self, url):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=self.timeout) as response:
-                    # Read just the first chunk to verify stream is working
-                    await response.content.read(1024)
-                    return url, True, response.status
+            return await self._probe(url)
+        except aiohttp.ClientResponseError as e:
+            return url, False, e.status
         except Exception as e:
             return url, False, str(e)
 
     async def check_streams(self, urls, verbose=False):
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+
         if verbose:
             console.print("[bold blue]Starting health checks on streams...[/]")
 
@@ -51,39 +111,48 @@ class StreamHealthCheck:
             task = progress.add_task(
                 "[cyan]Checking streams...", total=len(urls))
 
-            results = {}
-            for url in urls:
-                if verbose:
-                    progress.update(task, description=f"[cyan]Checking: {url}")
-                try:
-                    result = await self.check_stream(url)
-                    results[result[0]] = (result[1], result[2])
-                except Exception as e:
-                    results[url] = (False, str(e))
-                progress.advance(task)
+            # Bound the number of probes in flight against the shared host
+            sem = asyncio.Semaphore(MAX_CONCURRENT_CHECKS)
+
+            async def probe(url):
+                async with sem:
+                    return await self.check_stream(url)
 
-            return results
+            results = {}
+            tasks = [asyncio.create_task(probe(url)) for url in urls]
+            done = 0
+            for coro in asyncio.as_completed(tasks):
+                url, ok, info = await coro
+                results[url] = (ok, info)
+                done += 1
+                # Only refresh the progress display every few completions
+                if done % PROGRESS_BATCH == 0 or done == len(tasks):
+                    progress.update(
+                        task, completed=done,
+                        description=f"[cyan]Checked {done}/{len(tasks)}")
+
+            # Report results in station/mount order, not completion order
+            return {url: results[url] for url in urls}
 
 
 def fetch_station_data(verbose=False):
     # Use the /stations endpoint instead of /nowplaying for more concise data
     url = 'https://azura.theindiebeat.fm/api/stations'
-    headers = {'accept': 'application/json'}
 
     if verbose:
         console.print(f"[bold blue]Fetching station data from:[/] {url}")
 
-    response = requests.get(url, headers=headers)
+    response = SESSION.get(url)
     response.raise_for_status()
 
     if verbose:
         console.print(
             f"[green]Successfully fetched data[/] (Status: {response.status_code})")
 
-    return response.json()
+    return orjson.loads(response.content)
 
 
-def create_xspf_playlist(station_data, health_results):
+def create_xspf_playlist(healthy):
     playlist = Element('playlist', version="1", xmlns="http://xspf.org/ns/0/")
 
     title = SubElement(playlist, 'title')
@@ -95,95 +164,70 @@ def create_xspf_playlist(station_data, health_results):
 
     tracklist = SubElement(playlist, 'trackList')
 
-    for station in station_data:
-        for mount in station['mounts']:
-            if mount['format'] == 'mp3':
-                # Check if stream is healthy
-                health_status = health_results.get(
-                    mount['url'], (False, "Not checked"))[0]
-                if not health_status:
-                    continue
-
-                track = SubElement(tracklist, 'track')
+    for station, mount in healthy:
+        track = SubElement(tracklist, 'track')
 
-                location = SubElement(track, 'location')
-                location.text = mount['url']
+        location = SubElement(track, 'location')
+        location.text = mount['url']
 
-                title = SubElement(track, 'title')
-                title.text = station['name']
+        title = SubElement(track, 'title')
+        title.text = station['name']
 
-                creator = SubElement(track, 'creator')
-                creator.text = "The Indie Beat Radio"
+        creator = SubElement(track, 'creator')
+        creator.text = "The Indie Beat Radio"
 
-                annotation = SubElement(track, 'annotation')
-                annotation.text = station.get('description', '')
+        annotation = SubElement(track, 'annotation')
+        annotation.text = station.get('description', '')
 
-                info = SubElement(track, 'info')
-                info.text = station.get('url', '')
+        info = SubElement(track, 'info')
+        info.text = station.get('url', '')
 
-                # Add genre information if available
-                if 'genre' in station and station['genre']:
-                    meta = SubElement(track, 'meta', attrib={'rel': 'genre'})
-                    meta.text = station['genre']
+        # Add genre information if available
+        if 'genre' in station and station['genre']:
+            meta = SubElement(track, 'meta', attrib={'rel': 'genre'})
+            meta.text = station['genre']
 
-                # Add artwork if available
-                if 'art' in station and station['art']:
-                    image = SubElement(track, 'image')
-                    image.text = station['art']
+        # Add artwork if available
+        if 'art' in station and station['art']:
+            image = SubElement(track, 'image')
+            image.text = station['art']
 
-    rough_string = tostring(playlist, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
+    indent(playlist, space="  ")
+    return ElementTree(playlist)
 
 
-def create_m3u_playlist(station_data, health_results):
-    m3u_content = "#EXTM3U\n"
+def create_m3u_playlist(healthy):
+    yield "#EXTM3U\n"
 
-    for station in station_data:
-        for mount in station['mounts']:
-            if mount['format'] == 'mp3':
-                # Check if stream is healthy
-                health_status = health_results.get(
-                    mount['url'], (False, "Not checked"))[0]
-                if not health_status:
-                    continue
+    for station, mount in healthy:
+        # Add bitrate info if available
+        bitrate_info = f" - {mount['bitrate']}kbps" if 'bitrate' in mount else ""
 
-                # Add bitrate info if available
-                bitrate_info = f" - {mount['bitrate']}kbps" if 'bitrate' in mount else ""
+        yield f'#EXTINF:-1,{station["name"]}{bitrate_info}\n'
+        yield f'{mount["url"]}\n'
 
-                m3u_content += f'#EXTINF:-1,{station["name"]}{bitrate_info}\n'
-                m3u_content += f'{mount["url"]}\n'
 
-    return m3u_content
+def create_pls_playlist(healthy):
+    yield "[playlist]\n"
 
+    for valid_entries, (station, mount) in enumerate(healthy, start=1):
+        yield f'File{valid_entries}={mount["url"]}\n'
+        yield f'Title{valid_entries}={station["name"]}\n'
+        yield f'Length{valid_entries}=-1\n'
 
-def create_pls_playlist(station_data, health_results):
-    pls_content = "[playlist]\n"
-    valid_entries = 0
-
-    for station in station_data:
-        for mount in station['mounts']:
-            if mount['format'] == 'mp3':
-                # Check if stream is healthy
-                health_status = health_results.get(
-                    mount['url'], (False, "Not checked"))[0]
-                if not health_status:
-                    continue
-
-                valid_entries += 1
-                pls_content += f'File{valid_entries}={mount["url"]}\n'
-                pls_content += f'Title{valid_entries}={station["name"]}\n'
-                pls_content += f'Length{valid_entries}=-1\n'
-
-    pls_content += f'NumberOfEntries={valid_entries}\n'
-    pls_content += 'Version=2\n'
-
-    return pls_content
+    yield f'NumberOfEntries={len(healthy)}\n'
+    yield 'Version=2\n'
 
 
 def save_playlist(content, filename, verbose=False):
     with open(filename, 'w', encoding='utf-8') as f:
-        f.write(content)
+        if isinstance(content, ElementTree):
+            # Serialise the XML tree straight into the file
+            f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+            content.write(f, encoding='unicode')
+            f.write("\n")
+        else:
+            f.writelines(content)
     if verbose:
         console.print(f"[green]✓ Saved playlist:[/] {filename}")
 
@@ -226,13 +270,14 @@ async def main():
             console.print("[bold]Fetching station data...[/]")
         station_data = fetch_station_data(args.verbose)
 
-        # Get all MP3 stream URLs
-        stream_urls = [
-            mount['url']
+        # Get all MP3 mounts and their stream URLs
+        mp3_mounts = [
+            (station, mount)
             for station in station_data
             for mount in station['mounts']
             if mount['format'] == 'mp3'
         ]
+        stream_urls = [mount['url'] for _, mount in mp3_mounts]
 
         if args.list_streams:
             for url in stream_urls:
@@ -245,10 +290,11 @@ async def main():
             if not args.verbose:
                 console.print(
                     "[bold]Performing health checks on streams...[/]")
-            health_checker = StreamHealthCheck()
-            health_results = await health_checker.check_streams(stream_urls, args.verbose)
+            async with StreamHealthCheck() as health_checker:
+                health_results = await health_checker.check_streams(stream_urls, args.verbose)
 
             # Print health check results in a table
+            from rich.table import Table
             table = Table(title="Stream Health Check Results")
             table.add_column("URL", style="cyan")
             table.add_column("Status", style="bold")
@@ -269,6 +315,13 @@ async def main():
             if args.verbose:
                 console.print("[yellow]Health checks skipped[/]")
 
+        # Only healthy streams make it into the playlists
+        healthy = [
+            (station, mount)
+            for station, mount in mp3_mounts
+            if health_results.get(mount['url'], (False, "Not checked"))[0]
+        ]
+
         # Create and save playlists based on arguments
         if not args.verbose:
             console.print("[bold]Creating playlists...[/]")
@@ -279,19 +332,19 @@ async def main():
 
         if args.xspf:
             xspf_filename = f"{args.output}.xspf"
-            xspf_content = create_xspf_playlist(station_data, health_results)
+            xspf_content = create_xspf_playlist(healthy)
             save_playlist(xspf_content, xspf_filename, args.verbose)
             output_files.append(xspf_filename)
 
         if args.m3u:
             m3u_filename = f"{args.output}.m3u"
-            m3u_content = create_m3u_playlist(station_data, health_results)
+            m3u_content = create_m3u_playlist(healthy)
             save_playlist(m3u_content, m3u_filename, args.verbose)
             output_files.append(m3u_filename)
 
         if args.pls:
             pls_filename = f"{args.output}.pls"
-            pls_content = create_pls_playlist(station_data, health_results)
+            pls_content = create_pls_playlist(healthy)
             save_playlist(pls_content, pls_filename, args.verbose)
             output_files.append(pls_filename)
 
@@ -305,7 +358,7 @@ async def main():
             for file in output_files:
                 console.print(f"  • {file} [{os.path.getsize(file)} bytes]")
 
-    except requests.RequestException as e:
+    except (requests.RequestException, orjson.JSONDecodeError) as e:
         console.print(f"[bold red]Error fetching data from API:[/] {e}")
         return 1
     except Exception as e:
@@ -318,6 +371,12 @@ async def main():
     return 0
 
 if __name__ == "__main__":
+    uvloop = None
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    sys.exit(asyncio.run(main()))
+    else:
+        try:
+            import uvloop
+        except ImportError:
+            uvloop = None
+    sys.exit(uvloop.run(main()) if uvloop else asyncio.run(main()))